@@ -6,67 +6,105 @@ from keras import layers
 class MyTagger(object):
   def __init__(self):
     self.model = None
+    self.tagger = None
+    self.text_vectorizer = None
+    self._ort_sess = None
 
   def build_model(self, vocabulary):
     text_vectorizer = layers.TextVectorization(output_mode='int', output_sequence_length=128, standardize=None)
     text_vectorizer.adapt(vocabulary)
-    inputs = tf.keras.Input(shape=(1,), dtype=tf.string)
-    x = text_vectorizer(inputs)
-    x = layers.Embedding((text_vectorizer.vocabulary_size()+1), 32, mask_zero=True)(x)
+    self.text_vectorizer = text_vectorizer
+
+    # The tagger works on token ids, so training never runs the string vectorizer
+    ids = tf.keras.Input(shape=(128,), dtype=tf.int64)
+    x = layers.Embedding((text_vectorizer.vocabulary_size()+1), 32, mask_zero=True)(ids)
     x = layers.Bidirectional(layers.LSTM(64, return_sequences=True))(x)
     outputs = layers.TimeDistributed(layers.Dense(19, activation="softmax"))(x)
 
-    self.model = keras.Model(inputs= inputs, outputs= outputs)
-    self.model.summary()
+    self.tagger = keras.Model(inputs= ids, outputs= outputs)
+    self.tagger.compile(optimizer="Adam",
+                        loss="sparse_categorical_crossentropy", metrics=["accuracy"],
+                        jit_compile=True)
+    self.tagger.summary()
+
+    # String -> tags model sharing the tagger's weights, for raw sentences
+    inputs = tf.keras.Input(shape=(1,), dtype=tf.string)
+    self.model = keras.Model(inputs= inputs, outputs= self.tagger(text_vectorizer(inputs)))
+
+  def _vectorize(self, sentences):
+    return self.text_vectorizer(tf.convert_to_tensor(sentences, dtype=tf.string))
+
+  def _input_pipeline(self, tensors, batch_size, training=False):
+    # Only the training set is read more than once, so only it is cached
+    # and only its element order is allowed to vary.
+    ds = tf.data.Dataset.from_tensor_slices(tensors)
+    if training:
+      ds = ds.cache()
+    ds = ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+    options = tf.data.Options()
+    options.deterministic = not training
+    options.experimental_optimization.map_and_batch_fusion = True
+    return ds.with_options(options)
 
-tf.config.run_functions_eagerly(True)
-  @tf.function   
   def train(self, train_inputs, train_targets, num_epochs):
-    train_ds = tf.data.Dataset.from_tensor_slices((train_inputs, train_targets))
-    train_ds = train_ds.batch(64)
-    self.model.compile(optimizer="Adam",
-                        loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+    train_ds = self._input_pipeline((self._vectorize(train_inputs), train_targets), 64, training=True)
     print("\nTraining:\n")
-    self.model.fit(train_ds, epochs=num_epochs)
+    self.tagger.fit(train_ds, epochs=num_epochs)
 
   def evaluate(self, eval_inputs, eval_targets):
-    eval_ds = tf.data.Dataset.from_tensor_slices((eval_inputs, eval_targets))
-    eval_ds = eval_ds.batch(32)
+    eval_ds = self._input_pipeline((self._vectorize(eval_inputs), eval_targets), 32)
     print("\nEvaluation:\n")
-    self.model.evaluate(eval_ds)
+    self.tagger.evaluate(eval_ds)
+
+  def compile_for_inference(self, batch_size=32, use_trt=False, output_path="tagger.onnx"):
+    import tf2onnx
+    import onnxruntime as ort
+
+    # ONNX has no string vectorization, so only the int ids -> tags tagger is
+    # exported and the TextVectorization layer stays in TF.
+    # A fixed batch dimension lets TensorRT build a single optimized engine.
+    spec = (tf.TensorSpec((batch_size, 128), tf.int64, name="input"),)
+    tf2onnx.convert.from_keras(self.tagger, input_signature=spec, output_path=output_path)
+    providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    if use_trt:
+      providers.insert(0, "TensorrtExecutionProvider")
+    self._ort_sess = ort.InferenceSession(output_path, providers=providers)
+    self._ort_batch_size = batch_size
+
+  def _predict_probabilities(self, test_inputs, batch_size):
+    ids = self._vectorize(test_inputs)
+    if self._ort_sess is None:
+      # Keras batches tensors itself; building a tf.data pipeline per call
+      # only adds graph construction overhead
+      return self.tagger.predict(ids, batch_size=batch_size, verbose=0)
+    batch_size = self._ort_batch_size
+    ids = ids.numpy()
+    num_inputs = len(ids)
+    ids = np.pad(ids, ((0, -num_inputs % batch_size), (0, 0)))
+    input_name = self._ort_sess.get_inputs()[0].name
+    outputs = [self._ort_sess.run(None, {input_name: ids[i:i + batch_size]})[0]
+               for i in range(0, len(ids), batch_size)]
+    return np.concatenate(outputs)[:num_inputs]
+
+  def _strip_padding(self, predictions, seq_length):
+    all_ids = np.argmax(predictions, axis=-1).astype(np.int8)
+    return [ids[:seq_len].tolist() for ids, seq_len in zip(all_ids, seq_length)]
 
-  def predict_conllu(self, test_inputs, corpus):
-    results = []
-    test_ds = tf.data.Dataset.from_tensor_slices(test_inputs)
-    test_ds = test_ds.batch(32)
+  def predict_conllu(self, test_inputs, corpus, batch_size=32):
     print("\nPrediction:\n")
-    predictions = self.model.predict(test_ds)
-    seq_length = [seq.__len__() for seq in corpus]
-    pred_no_padding = [pred[:seq_len] for pred, seq_len in zip(predictions, seq_length)]
-    for prediction in pred_no_padding:
-        result = []
-        for sentence in prediction:
-            index = np.argmax(sentence)
-            result.append(index)
-        results.append(result)
-    return results
+    predictions = self._predict_probabilities(test_inputs, batch_size)
+    seq_length = np.fromiter((len(seq) for seq in corpus), dtype=np.int32, count=len(corpus))
+    return self._strip_padding(predictions, seq_length)
   
-  def predict(self, test_inputs):
-    results = []
-    test_ds = tf.data.Dataset.from_tensor_slices(test_inputs)
-    test_ds = test_ds.batch(32)
+  def predict(self, test_inputs, batch_size=32):
     print("\nPrediction:\n")
-    predictions = self.model.predict(test_ds)
-    seq_length = [len(seq.split()) for seq in test_inputs]
-    pred_no_padding = [pred[:seq_len] for pred, seq_len in zip(predictions, seq_length)]
-    for prediction in pred_no_padding:
-        result = []
-        for sentence in prediction:
-            index = np.argmax(sentence)
-            result.append(index)
-        results.append(result)
-    return results
+    predictions = self._predict_probabilities(test_inputs, batch_size)
+    seq_length = np.fromiter((len(seq.split()) for seq in test_inputs), dtype=np.int32, count=len(test_inputs))
+    return self._strip_padding(predictions, seq_length)
 
   def padding(self, targets):
-      padded_targets = tf.keras.utils.pad_sequences(targets, maxlen= 128, padding="post")
+      padded_targets = np.zeros((len(targets), 128), dtype=np.int8)
+      for i, target in enumerate(targets):
+          target = target[:128]
+          padded_targets[i, :len(target)] = target
       return padded_targets
\ No newline at end of file
@@ -17,15 +17,14 @@ class ReadUDTreebank(object):
         inputs = []
         targets = []
         for sentence in corpus:
-          tokens = []
-          pos = []
-          for token in sentence:
-            if sentence.__len__()<128:
-              if not (token.is_multiword() or token.is_empty_node()):
-                tokens = np.append(tokens, token.form)
-                pos = np.append(pos, token.upos)
-          inputs.append(" ".join(tokens))
-          targets.append(pos)
+          # Long sentences are kept as empty entries so outputs stay aligned with the corpus
+          if len(sentence)>=128:
+            inputs.append("")
+            targets.append([])
+            continue
+          kept = [token for token in sentence if not (token.is_multiword() or token.is_empty_node())]
+          inputs.append(" ".join([token.form for token in kept]))
+          targets.append([token.upos for token in kept])
 
         inputs = np.array(inputs, dtype= object)
         targets = np.array(targets, dtype = object)
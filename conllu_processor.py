@@ -10,15 +10,38 @@ for neural PoS tagging models.
 Author: Student Implementation for NLU Lab 1
 """
 
+import contextlib
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import pickle
 import re
-from typing import List, Tuple, Dict, Optional
+import sys
+from typing import Iterator, List, Tuple, Dict, Optional
+from array import array
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sentences are separated by one or more blank lines
+SENTENCE_BOUNDARY = re.compile(rb'\n\s*\n')
+
+# Token IDs of multiword tokens ("1-2") and empty nodes ("10.1"), capturing
+# the separator that tells them apart
+SKIPPED_TOKEN_ID = re.compile(rb'^\d+([-.])', re.MULTILINE)
+
+# Parsed files are cached in the repository's (gitignored) cache directory.
+# Bump CACHE_VERSION whenever the parse output or the processor's attributes
+# change, so caches written by older code are no longer read.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "conllu")
+CACHE_VERSION = 2
+
 
 class CoNLLUProcessor:
     """
@@ -34,28 +57,57 @@ class CoNLLUProcessor:
     
     def __init__(self):
         """Initialize the processor with empty data structures."""
-        self.sentences = []  # List of sentences, each sentence is list of (word, upos) tuples
-        self.raw_sentences = []  # Keep raw data for debugging
+        # Tokens are stored column-wise: sentence i spans forms[sent_offsets[i]:sent_offsets[i + 1]].
+        # The offsets are a packed int32 array rather than a list of int objects.
+        self.forms: List[str] = []
+        self.upos: List[str] = []
+        self.sent_offsets: array = array('i', [0])
         self.removed_multiword_count = 0
         self.removed_empty_nodes = 0
         self.removed_long_sentences = 0
         self.total_sentences_processed = 0
         self.max_sentence_length = 128
+        # Results of the get_* accessors, cleared whenever new data is loaded
+        self._accessor_cache = {}
         
-    def load_conllu_file(self, filepath: str, max_sentence_length: int = 128) -> None:
+    def load_conllu_file(self, filepath: str, max_sentence_length: int = 128,
+                         use_cache: bool = True) -> None:
         """
         Load and process a CoNLL-U file.
         
+        The parsed result is pickled to CACHE_DIR, keyed on the file's path,
+        modification time and size, max_sentence_length and CACHE_VERSION, so
+        later loads of an unchanged file skip parsing. The cache is only used
+        when the processor does not hold data from a previous load yet.
+        
         Args:
             filepath (str): Path to the .conllu file
             max_sentence_length (int): Maximum allowed sentence length (default: 128)
+            use_cache (bool): Whether to read and write the parse cache (default: True)
         """
         self.max_sentence_length = max_sentence_length
+        self._accessor_cache.clear()
         logger.info(f"Loading CoNLL-U file: {filepath}")
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                self._parse_conllu_content(file.readlines())
+            cache_path = None
+            if use_cache and self.total_sentences_processed == 0:
+                cache_path = self._cache_path(filepath, max_sentence_length)
+            
+            if cache_path and self._load_cache(cache_path):
+                logger.info(f"Using cached parse from {cache_path}")
+            else:
+                fd = os.open(filepath, os.O_RDONLY)
+                try:
+                    # mmap cannot map empty files
+                    if os.fstat(fd).st_size > 0:
+                        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as data:
+                            self._parse_conllu_bytes(data)
+                finally:
+                    os.close(fd)
+                
+                if cache_path:
+                    self._save_cache(cache_path)
             
             logger.info(f"Successfully loaded {filepath}")
             self.print_statistics()
@@ -67,15 +119,153 @@ class CoNLLUProcessor:
             logger.error(f"Error loading file {filepath}: {str(e)}")
             raise
     
-    def _parse_conllu_content(self, lines: List[str]) -> None:
+    @staticmethod
+    def _cache_path(filepath: str, max_sentence_length: int) -> str:
+        """
+        Get the parse cache file for a CoNLL-U file.
+        
+        Args:
+            filepath (str): Path to the .conllu file
+            max_sentence_length (int): Maximum allowed sentence length
+            
+        Returns:
+            str: Path of the pickle in CACHE_DIR
+        """
+        stat = os.stat(filepath)
+        key = (f"{CACHE_VERSION}:{os.path.abspath(filepath)}:{stat.st_mtime_ns}:"
+               f"{stat.st_size}:{max_sentence_length}")
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(CACHE_DIR, f"conllu_{digest}.pkl")
+    
+    def _load_cache(self, cache_path: str) -> bool:
+        """
+        Restore the processor state from a parse cache file.
+        
+        The cache is only applied if it was written with the current
+        CACHE_VERSION and holds exactly the processor's attributes.
+        
+        Args:
+            cache_path (str): Path of the cache pickle
+            
+        Returns:
+            bool: True if the cache was found and loaded
+        """
+        try:
+            with open(cache_path, 'rb') as file:
+                cached = pickle.load(file)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache {cache_path}: {str(e)}")
+            return False
+        
+        if (not isinstance(cached, dict) or cached.get('version') != CACHE_VERSION
+                or not isinstance(cached.get('state'), dict)
+                or cached['state'].keys() != self.__dict__.keys()):
+            logger.warning(f"Ignoring cache {cache_path} written by another version")
+            return False
+        
+        self.__dict__.update(cached['state'])
+        return True
+    
+    def _save_cache(self, cache_path: str) -> None:
+        """
+        Write the processor state to a parse cache file.
+        
+        Args:
+            cache_path (str): Path of the cache pickle
+        """
+        # The attribute dict rather than the instance, so the cache does not
+        # depend on the module the class was imported from
+        cached = {'version': CACHE_VERSION, 'state': self.__dict__}
+        
+        # Write to a temporary file first so readers never see a partial pickle
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                pickle.dump(cached, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write cache {cache_path}: {str(e)}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    
+    def _parse_conllu_bytes(self, content: bytes) -> None:
+        """
+        Parse the raw bytes of a CoNLL-U file one sentence block at a time.
+        
+        The token lines of a block are split in one comprehension and their
+        column counts are checked before any field is read. Blocks with
+        malformed lines go through the line-by-line parser so that they are
+        reported exactly as before. Multiword tokens and empty nodes dropped
+        by the fast filter are counted with one regex pass over the block;
+        only blocks with invalid tags fall back to per-token checks. Comment
+        lines are never decoded, and of the token lines only FORM and UPOS
+        are; both are interned so that repeated words and tags share one
+        string object.
+        
+        Args:
+            content (bytes): Full content of the file (bytes or a mmap)
+        """
+        for block in self._iter_sentence_blocks(content):
+            rows = [line.split(b'\t', 4) for line in block.split(b'\n')
+                    if line and not line.startswith(b'#')]
+            
+            # Every token line must have exactly 10 columns (9 tabs). The
+            # count is taken per row, since comment lines may contain tabs too.
+            if not all(len(row) == 5 and row[4].count(b'\t') == 5 for row in rows):
+                # split('\n') rather than splitlines(), which would also break
+                # lines at characters such as \x0c or \u2028 inside a FORM
+                self._parse_conllu_lines(block.decode().split('\n'))
+                continue
+            
+            sentence = [(sys.intern(row[1].decode()), sys.intern(row[3].decode())) for row in rows
+                        if row[0].isdigit() and row[1] and row[3] and row[3] != b'_']
+            skipped = SKIPPED_TOKEN_ID.findall(block) if len(sentence) != len(rows) else []
+            if len(sentence) + len(skipped) == len(rows):
+                multiword_count = skipped.count(b'-')
+                self.removed_multiword_count += multiword_count
+                self.removed_empty_nodes += len(skipped) - multiword_count
+            else:
+                sentence = [token_data for token_data in
+                            (self._parse_token_fields(row[0].decode(), row[1].decode(),
+                                                      row[3].decode()) for row in rows)
+                            if token_data]
+            
+            if sentence:
+                self._process_completed_sentence(sentence)
+    
+    @staticmethod
+    def _iter_sentence_blocks(content: bytes) -> Iterator[bytes]:
+        """
+        Yield the sentence blocks of a CoNLL-U file one at a time.
+        
+        Unlike ``SENTENCE_BOUNDARY.split`` this never builds the list of all
+        blocks, so only the block being parsed is copied out of the mmap.
+        
+        Args:
+            content (bytes): Full content of the file (bytes or a mmap)
+            
+        Returns:
+            Iterator[bytes]: The raw bytes of each block, boundaries excluded
+        """
+        start = 0
+        for boundary in SENTENCE_BOUNDARY.finditer(content):
+            yield content[start:boundary.start()]
+            start = boundary.end()
+        yield content[start:]
+    
+    def _parse_conllu_lines(self, lines: List[str]) -> None:
         """
-        Parse the content of a CoNLL-U file line by line.
+        Parse CoNLL-U content line by line.
         
         Args:
-            lines (List[str]): All lines from the file
+            lines (List[str]): Lines to parse
         """
         current_sentence = []
-        current_raw_sentence = []
         
         for line_num, line in enumerate(lines, 1):
             line = line.strip()
@@ -83,14 +273,12 @@ class CoNLLUProcessor:
             # Skip empty lines (sentence boundaries)
             if not line:
                 if current_sentence:
-                    self._process_completed_sentence(current_sentence, current_raw_sentence)
+                    self._process_completed_sentence(current_sentence)
                     current_sentence = []
-                    current_raw_sentence = []
                 continue
             
             # Skip comment lines (metadata)
             if line.startswith('#'):
-                current_raw_sentence.append(line)
                 continue
             
             # Parse token lines
@@ -98,7 +286,6 @@ class CoNLLUProcessor:
                 token_data = self._parse_token_line(line)
                 if token_data:
                     current_sentence.append(token_data)
-                    current_raw_sentence.append(line)
             except Exception as e:
                 logger.warning(f"Error parsing line {line_num}: {line}")
                 logger.warning(f"Error details: {str(e)}")
@@ -106,7 +293,7 @@ class CoNLLUProcessor:
         
         # Process the last sentence if file doesn't end with empty line
         if current_sentence:
-            self._process_completed_sentence(current_sentence, current_raw_sentence)
+            self._process_completed_sentence(current_sentence)
     
     def _parse_token_line(self, line: str) -> Optional[Tuple[str, str]]:
         """
@@ -125,10 +312,21 @@ class CoNLLUProcessor:
             logger.warning(f"Line doesn't have 10 columns: {line}")
             return None
         
-        token_id = parts[0]
-        word_form = parts[1]
-        upos_tag = parts[3]
+        return self._parse_token_fields(parts[0], parts[1], parts[3])
+    
+    def _parse_token_fields(self, token_id: str, word_form: str,
+                            upos_tag: str) -> Optional[Tuple[str, str]]:
+        """
+        Filter a token given its ID, FORM and UPOS columns.
         
+        Args:
+            token_id (str): The token ID from column 1
+            word_form (str): The word form from column 2
+            upos_tag (str): The UPOS tag from column 4
+            
+        Returns:
+            Optional[Tuple[str, str]]: (word, upos_tag) tuple or None if token should be skipped
+        """
         # Skip multiword tokens (e.g., "1-2", "19-20")
         if self._is_multiword_token(token_id):
             self.removed_multiword_count += 1
@@ -141,10 +339,11 @@ class CoNLLUProcessor:
         
         # Validate that we have valid word and UPOS tag
         if not word_form or not upos_tag or upos_tag == '_':
-            logger.warning(f"Invalid word or UPOS tag in line: {line}")
+            logger.warning(f"Invalid word or UPOS tag for token {token_id}: {word_form!r} {upos_tag!r}")
             return None
         
-        return (word_form, upos_tag)
+        # Interned so repeated words and tags share one string object
+        return (sys.intern(word_form), sys.intern(upos_tag))
     
     def _is_multiword_token(self, token_id: str) -> bool:
         """
@@ -156,7 +355,7 @@ class CoNLLUProcessor:
         Returns:
             bool: True if this is a multiword token
         """
-        return '-' in token_id and not token_id.startswith('#')
+        return '-' in token_id
     
     def _is_empty_node(self, token_id: str) -> bool:
         """
@@ -170,14 +369,12 @@ class CoNLLUProcessor:
         """
         return '.' in token_id
     
-    def _process_completed_sentence(self, sentence: List[Tuple[str, str]], 
-                                   raw_sentence: List[str]) -> None:
+    def _process_completed_sentence(self, sentence: List[Tuple[str, str]]) -> None:
         """
         Process a completed sentence and decide whether to keep it.
         
         Args:
             sentence (List[Tuple[str, str]]): List of (word, upos) pairs
-            raw_sentence (List[str]): Original lines for debugging
         """
         self.total_sentences_processed += 1
         
@@ -189,17 +386,49 @@ class CoNLLUProcessor:
         
         # Keep sentences with at least 1 token
         if len(sentence) > 0:
-            self.sentences.append(sentence)
-            self.raw_sentences.append(raw_sentence)
+            self.forms.extend(word for word, _ in sentence)
+            self.upos.extend(pos for _, pos in sentence)
+            self.sent_offsets.append(len(self.forms))
+    
+    def _sentence_lengths(self) -> List[int]:
+        """Get the length of every kept sentence."""
+        offsets = self.sent_offsets
+        return [end - start for start, end in zip(offsets, offsets[1:])]
+    
+    def _cached(self, name: str, compute):
+        """Return the cached result of an accessor, computing it on first use."""
+        if name not in self._accessor_cache:
+            self._accessor_cache[name] = compute()
+        return self._accessor_cache[name]
     
     def get_word_pos_pairs(self) -> List[List[Tuple[str, str]]]:
         """
         Get the processed sentences as lists of (word, UPOS) pairs.
         
+        The pairs are rebuilt from the forms and upos columns on the first
+        call and cached until the next file is loaded.
+        
         Returns:
             List[List[Tuple[str, str]]]: List of sentences, each containing (word, upos) tuples
         """
-        return self.sentences
+        offsets = self.sent_offsets
+        return self._cached('word_pos_pairs', lambda: [
+            list(zip(self.forms[start:end], self.upos[start:end]))
+            for start, end in zip(offsets, offsets[1:])
+        ])
+    
+    def get_columns(self) -> Tuple[List[str], List[str], array]:
+        """
+        Get the processed sentences as flat token columns.
+        
+        Sentence i spans forms[offsets[i]:offsets[i + 1]] and the same
+        slice of upos. The columns are returned as stored, without copying
+        or building (word, UPOS) tuples.
+        
+        Returns:
+            Tuple[List[str], List[str], array]: (forms, upos, offsets) columns
+        """
+        return self.forms, self.upos, self.sent_offsets
     
     def get_vocabulary(self) -> Dict[str, int]:
         """
@@ -208,11 +437,8 @@ class CoNLLUProcessor:
         Returns:
             Dict[str, int]: Word frequency dictionary
         """
-        word_counts = Counter()
-        for sentence in self.sentences:
-            for word, _ in sentence:
-                word_counts[word] += 1
-        return dict(word_counts)
+        # The counts are cached, but each call gets its own dict to modify
+        return dict(self._cached('vocabulary', lambda: Counter(self.forms)))
     
     def get_pos_tags(self) -> Dict[str, int]:
         """
@@ -221,11 +447,7 @@ class CoNLLUProcessor:
         Returns:
             Dict[str, int]: POS tag frequency dictionary
         """
-        pos_counts = Counter()
-        for sentence in self.sentences:
-            for _, pos in sentence:
-                pos_counts[pos] += 1
-        return dict(pos_counts)
+        return dict(self._cached('pos_tags', lambda: Counter(self.upos)))
     
     def get_sentence_length_distribution(self) -> Dict[int, int]:
         """
@@ -234,10 +456,8 @@ class CoNLLUProcessor:
         Returns:
             Dict[int, int]: Dictionary mapping sentence length to count
         """
-        length_counts = Counter()
-        for sentence in self.sentences:
-            length_counts[len(sentence)] += 1
-        return dict(length_counts)
+        return dict(self._cached('sentence_lengths',
+                                 lambda: Counter(self._sentence_lengths())))
     
     def print_statistics(self) -> None:
         """Print detailed statistics about the processed data."""
@@ -245,16 +465,17 @@ class CoNLLUProcessor:
         print("CoNLL-U Processing Statistics")
         print(f"{'='*60}")
         print(f"Total sentences processed: {self.total_sentences_processed}")
-        print(f"Sentences kept: {len(self.sentences)}")
+        print(f"Sentences kept: {len(self.sent_offsets) - 1}")
         print(f"Sentences removed (length > {self.max_sentence_length}): {self.removed_long_sentences}")
         print(f"Multiword tokens removed: {self.removed_multiword_count}")
         print(f"Empty nodes removed: {self.removed_empty_nodes}")
         
-        if self.sentences:
-            total_tokens = sum(len(sent) for sent in self.sentences)
-            avg_length = total_tokens / len(self.sentences)
-            max_length = max(len(sent) for sent in self.sentences)
-            min_length = min(len(sent) for sent in self.sentences)
+        if self.forms:
+            sentence_lengths = self._sentence_lengths()
+            total_tokens = len(self.forms)
+            avg_length = total_tokens / len(sentence_lengths)
+            max_length = max(sentence_lengths)
+            min_length = min(sentence_lengths)
             
             print(f"\nSentence Statistics:")
             print(f"Total tokens: {total_tokens}")
@@ -275,43 +496,125 @@ class CoNLLUProcessor:
             print(f"{'='*60}")
 
 
+def _parse_file(path: str, max_sentence_length: int) -> Tuple[CoNLLUProcessor, str]:
+    """
+    Load one CoNLL-U file in a worker process, capturing the statistics it prints.
+    
+    Args:
+        path (str): Path to the .conllu file
+        max_sentence_length (int): Maximum sentence length to keep
+        
+    Returns:
+        Tuple[CoNLLUProcessor, str]: The loaded processor and its printed statistics
+    """
+    processor = CoNLLUProcessor()
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        processor.load_conllu_file(path, max_sentence_length)
+    # Accessor results are cheap to rebuild and would only add to what gets pickled
+    processor._accessor_cache.clear()
+    return processor, output.getvalue()
+
+
+def _has_cached_parse(path: str, max_sentence_length: int) -> bool:
+    """
+    Check whether a CoNLL-U file has a parse cache file.
+    
+    Args:
+        path (str): Path to the .conllu file
+        max_sentence_length (int): Maximum sentence length to keep
+        
+    Returns:
+        bool: True if a cache file exists for the file's current version
+    """
+    try:
+        return os.path.exists(CoNLLUProcessor._cache_path(path, max_sentence_length))
+    except OSError:
+        # Missing files are reported by load_conllu_file
+        return False
+
+
 def load_ud_english_data(train_path: str, dev_path: str, test_path: str, 
-                        max_sentence_length: int = 128) -> Dict[str, CoNLLUProcessor]:
+                        max_sentence_length: int = 128,
+                        parallel: bool = False) -> Dict[str, CoNLLUProcessor]:
     """
     Load all three UD English treebank files.
     
+    With parallel=True, files without a warm parse cache are parsed in
+    worker processes. The workers import the calling script again, so the
+    call must then sit under an ``if __name__ == "__main__":`` guard.
+    
     Args:
         train_path (str): Path to training .conllu file
         dev_path (str): Path to development .conllu file
         test_path (str): Path to test .conllu file
         max_sentence_length (int): Maximum sentence length to keep
+        parallel (bool): Whether to parse uncached files in worker processes (default: False)
         
     Returns:
         Dict[str, CoNLLUProcessor]: Dictionary with 'train', 'dev', 'test' processors
     """
-    processors = {}
-    
-    # Load training data
-    print("Loading training data...")
-    train_processor = CoNLLUProcessor()
-    train_processor.load_conllu_file(train_path, max_sentence_length)
-    processors['train'] = train_processor
+    splits = [
+        ('train', "Loading training data...", train_path),
+        ('dev', "\nLoading development data...", dev_path),
+        ('test', "\nLoading test data...", test_path),
+    ]
     
-    # Load development data
-    print("\nLoading development data...")
-    dev_processor = CoNLLUProcessor()
-    dev_processor.load_conllu_file(dev_path, max_sentence_length)
-    processors['dev'] = dev_processor
+    # Results of the worker processes, by split index
+    parsed = {}
+    if parallel:
+        # Only worth it for two or more uncached files on more than one CPU;
+        # cache hits are cheaper to load here than to ship back from a worker.
+        # Workers come from forkserver (spawn on Windows) rather than fork,
+        # which is unsafe once the caller has threads running.
+        pending = [i for i, (_, _, path) in enumerate(splits)
+                   if not _has_cached_parse(path, max_sentence_length)]
+        if len(pending) > 1 and (os.cpu_count() or 1) > 1:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            with ProcessPoolExecutor(max_workers=len(pending),
+                                     mp_context=multiprocessing.get_context(start_method)) as executor:
+                futures = {i: executor.submit(_parse_file, splits[i][2], max_sentence_length)
+                           for i in pending}
+                for i, future in futures.items():
+                    parsed[i] = future.result()
     
-    # Load test data
-    print("\nLoading test data...")
-    test_processor = CoNLLUProcessor()
-    test_processor.load_conllu_file(test_path, max_sentence_length)
-    processors['test'] = test_processor
+    processors = {}
+    for i, (name, message, path) in enumerate(splits):
+        print(message)
+        if i in parsed:
+            # Statistics captured by the worker are printed here, in order
+            processor, statistics = parsed[i]
+            sys.stdout.write(statistics)
+        else:
+            processor = CoNLLUProcessor()
+            processor.load_conllu_file(path, max_sentence_length)
+        processors[name] = processor
     
     return processors
 
 
+def load_ud_english_columns(train_path: str, dev_path: str, test_path: str,
+                           max_sentence_length: int = 128,
+                           parallel: bool = False) -> Dict[str, Tuple[List[str], List[str], array]]:
+    """
+    Load all three UD English treebank files as flat token columns.
+    
+    Args:
+        train_path (str): Path to training .conllu file
+        dev_path (str): Path to development .conllu file
+        test_path (str): Path to test .conllu file
+        max_sentence_length (int): Maximum sentence length to keep
+        parallel (bool): Whether to parse uncached files in worker processes,
+            see load_ud_english_data (default: False)
+        
+    Returns:
+        Dict[str, Tuple[List[str], List[str], array]]: Dictionary with the
+        (forms, upos, offsets) columns of 'train', 'dev' and 'test'
+    """
+    processors = load_ud_english_data(train_path, dev_path, test_path,
+                                      max_sentence_length, parallel)
+    return {name: processor.get_columns() for name, processor in processors.items()}
+
+
 def demonstrate_usage():
     """Demonstrate how to use the CoNLLU processor."""
     print("CoNLL-U Processor Demonstration")
@@ -3,6 +3,10 @@
 Test script for the CoNLL-U processor to validate functionality.
 """
 
+import os
+import tempfile
+
+import conllu_processor
 from conllu_processor import CoNLLUProcessor, load_ud_english_data
 
 def test_processor_on_sample():
@@ -84,6 +88,104 @@ def test_multiword_detection():
             else:
                 print(f"✗ {token_id:6s}: Regular token incorrectly flagged for removal")
 
+def test_malformed_lines():
+    """Test that malformed token lines are skipped, even next to comments with tabs."""
+    print("\nTesting malformed line handling...")
+    print("=" * 40)
+    
+    # Tabs in the first comment must not make up for the short token line after it,
+    # and a 9-column token line must be rejected like any other malformed line
+    content = (
+        "# text = a\tb\tc\td\te\tf\tg\th\n"
+        "1\tHi\tx\n"
+        "2\tok\tok\tNOUN\t_\t_\t0\troot\t_\t_\n"
+        "\n"
+        "# note = c\tc\n"
+        "1\tnine\tnine\tVERB\t_\t_\t0\troot\t_\n"
+        "2\tten\tten\tADJ\t_\t_\t1\tamod\t_\t_\n"
+        "\n"
+        # A form feed inside a FORM must not split its line in a malformed block
+        "1\tA\x0cB\ta\tNOUN\t_\t_\t0\troot\t_\t_\n"
+        "2\tbad\n"
+        "\n"
+    )
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "malformed.conllu")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        
+        processor = CoNLLUProcessor()
+        try:
+            processor.load_conllu_file(path, use_cache=False)
+        except Exception as e:
+            print(f"✗ Loading a file with malformed lines failed: {e}")
+            return False
+    
+    expected = [[("ok", "NOUN")], [("ten", "ADJ")], [("A\x0cB", "NOUN")]]
+    if processor.get_word_pos_pairs() == expected:
+        print("✓ Malformed lines skipped, valid tokens kept")
+        return True
+    print(f"✗ Expected {expected}, got {processor.get_word_pos_pairs()}")
+    return False
+
+def test_parse_cache():
+    """Test that parsed files are cached and reparsed when the file changes."""
+    print("\nTesting parse cache...")
+    print("=" * 40)
+    
+    parse_count = []
+    
+    class CountingProcessor(CoNLLUProcessor):
+        def _parse_conllu_bytes(self, content):
+            parse_count.append(1)
+            super()._parse_conllu_bytes(content)
+    
+    def load(path, **kwargs):
+        processor = CountingProcessor()
+        processor.load_conllu_file(path, **kwargs)
+        return processor
+    
+    content = "1\tHi\thi\tINTJ\t_\t_\t0\troot\t_\t_\n\n"
+    original_cache_dir = conllu_processor.CACHE_DIR
+    passed = True
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test's cache files out of the real cache directory
+        conllu_processor.CACHE_DIR = os.path.join(tmp_dir, "cache")
+        try:
+            path = os.path.join(tmp_dir, "sample.conllu")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            
+            checks = []
+            
+            first = load(path)
+            checks.append(("First load parses the file", len(parse_count) == 1))
+            
+            second = load(path)
+            checks.append(("Second load is served from the cache",
+                           len(parse_count) == 1
+                           and second.get_word_pos_pairs() == first.get_word_pos_pairs()))
+            
+            mtime = os.path.getmtime(path) + 10
+            os.utime(path, (mtime, mtime))
+            load(path)
+            checks.append(("Changing the file's mtime reparses it", len(parse_count) == 2))
+            
+            cache_files = sorted(os.listdir(conllu_processor.CACHE_DIR))
+            load(path, use_cache=False)
+            checks.append(("use_cache=False reparses without writing a cache",
+                           len(parse_count) == 3
+                           and sorted(os.listdir(conllu_processor.CACHE_DIR)) == cache_files))
+        finally:
+            conllu_processor.CACHE_DIR = original_cache_dir
+    
+    for description, ok in checks:
+        print(f"{'✓' if ok else '✗'} {description}")
+        passed = passed and ok
+    return passed
+
 def run_full_test():
     """Run comprehensive test on all three datasets."""
     print("\n" + "="*60)
@@ -143,6 +245,10 @@ if __name__ == "__main__":
     print("CoNLL-U Processor Test Suite")
     print("=" * 60)
     
+    # Tests with their own sample data run first, as they need no dataset files
+    samples_passed = test_malformed_lines()
+    samples_passed = test_parse_cache() and samples_passed
+    
     # Run basic test
     success = test_processor_on_sample()
     
@@ -153,15 +259,19 @@ if __name__ == "__main__":
         # Run full comprehensive test
         processors = run_full_test()
         
-        if processors:
+        if processors and samples_passed:
             print(f"\n" + "="*60)
             print("ALL TESTS PASSED! ✓")
             print("Your data processing functions are working correctly.")
             print("="*60)
-        else:
+        elif not processors:
             print(f"\n" + "="*60)
             print("Full test failed - check file paths")
             print("="*60)
+        else:
+            print(f"\n" + "="*60)
+            print("Sample data tests failed")
+            print("="*60)
     else:
         print(f"\n" + "="*60)
         print("Basic test failed")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Smoke test for MyTagger: build, train, evaluate and predict on a tiny corpus.
+"""
+
+from Mapper import Mapper
+from MyTagger import MyTagger
+
+def test_tagger_smoke():
+    """Build the XLA-compiled BiLSTM tagger and run it end to end on a tiny corpus."""
+    print("Testing MyTagger build/train/predict...")
+    print("=" * 50)
+    
+    sentences = [["the", "dog", "runs"], ["a", "cat", "sleeps", "here"], ["dogs", "run"]]
+    tags = [["DET", "NOUN", "VERB"], ["DET", "NOUN", "VERB", "ADV"], ["NOUN", "VERB"]]
+    inputs = [" ".join(sentence) for sentence in sentences]
+    vocabulary = sorted({word for sentence in sentences for word in sentence})
+    
+    mapper = Mapper()
+    tagger = MyTagger()
+    try:
+        tagger.build_model(vocabulary)
+        targets = tagger.padding(mapper.mapping(tags))
+        tagger.train(inputs, targets, num_epochs=2)
+        tagger.evaluate(inputs, targets)
+        predictions = tagger.predict(inputs)
+        predictions_conllu = tagger.predict_conllu(inputs, sentences)
+    except Exception as e:
+        print(f"✗ Tagger failed with error: {e}")
+        return False
+    
+    checks = [
+        ("Tagger is compiled with XLA", tagger.tagger.jit_compile is True),
+        ("One prediction per sentence", len(predictions) == len(sentences)),
+        ("Padding stripped from every prediction",
+         [len(p) for p in predictions] == [len(s) for s in sentences]),
+        ("predict_conllu agrees with predict", predictions_conllu == predictions),
+        ("Predicted ids are valid tag ids",
+         all(0 <= i < 19 for p in predictions for i in p)),
+        ("Predictions decode to tags",
+         [len(t) for t in mapper.unmapping(predictions)] == [len(s) for s in sentences]),
+    ]
+    
+    passed = True
+    for description, ok in checks:
+        print(f"{'✓' if ok else '✗'} {description}")
+        passed = passed and ok
+    return passed
+
+if __name__ == "__main__":
+    print("MyTagger Smoke Test")
+    print("=" * 60)
+    
+    if test_tagger_smoke():
+        print(f"\n" + "="*60)
+        print("ALL TESTS PASSED! ✓")
+        print("="*60)
+    else:
+        print(f"\n" + "="*60)
+        print("Tagger smoke test failed")
+        print("="*60)
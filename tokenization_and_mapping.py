@@ -9,10 +9,14 @@ required for training a neural sequence labeling model (e.g., LSTM PoS tagger).
 Author: Student Implementation for NLU Lab 1
 """
 
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from itertools import chain, repeat
 import numpy as np
-from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from conllu_processor import load_ud_english_data
+from conllu_processor import CACHE_VERSION as PARSE_CACHE_VERSION, load_ud_english_columns
 
 # ------------------------------------------------------------
 # 1. Load already processed UD English data
@@ -21,22 +25,30 @@ print("Loading preprocessed UD English EWT datasets...")
 train_path = "data/ud_english_ewt/en_ewt-ud-train.conllu"
 dev_path = "data/ud_english_ewt/en_ewt-ud-dev.conllu"
 test_path = "data/ud_english_ewt/en_ewt-ud-test.conllu"
+MAX_LEN = 128
+
+# Prepared arrays are cached next to this script. Bump PREPARED_CACHE_VERSION
+# whenever the vocabulary, encoding or padding changes; the parser's own
+# CACHE_VERSION is part of the key too, so parser changes also invalidate it.
+PREPARED_CACHE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "ewt_prepared")
+PREPARED_CACHE_VERSION = 1
 
-datasets = load_ud_english_data(train_path, dev_path, test_path)
-train_data = datasets["train"].get_word_pos_pairs()
-dev_data = datasets["dev"].get_word_pos_pairs()
-test_data = datasets["test"].get_word_pos_pairs()
+# Flat (forms, upos, offsets) columns per split, so no (word, tag) tuples are built
+datasets = load_ud_english_columns(train_path, dev_path, test_path)
+train_data, dev_data, test_data = datasets["train"], datasets["dev"], datasets["test"]
 
-print(f"Loaded {len(train_data)} training sentences, "
-      f"{len(dev_data)} dev sentences, {len(test_data)} test sentences.\n")
+print(f"Loaded {len(train_data[2]) - 1} training sentences, "
+      f"{len(dev_data[2]) - 1} dev sentences, {len(test_data[2]) - 1} test sentences.\n")
 
 # ------------------------------------------------------------
 # 2. Extract words and tags from sentences
 # ------------------------------------------------------------
-def split_words_tags(sentences):
-    """Split list of (word, tag) pairs into two separate lists."""
-    X = [[w for (w, t) in sent] for sent in sentences]
-    y = [[t for (w, t) in sent] for sent in sentences]
+def split_words_tags(columns):
+    """Slice flat (forms, upos, offsets) columns into per-sentence word and tag lists."""
+    forms, upos, offsets = columns
+    bounds = list(zip(offsets, offsets[1:]))
+    X = [forms[start:end] for start, end in bounds]
+    y = [upos[start:end] for start, end in bounds]
     return X, y
 
 X_train, y_train = split_words_tags(train_data)
@@ -44,16 +56,49 @@ X_dev, y_dev = split_words_tags(dev_data)
 X_test, y_test = split_words_tags(test_data)
 
 # ------------------------------------------------------------
-# 3. Tokenizer for words
+# 3. Word vocabulary
 # ------------------------------------------------------------
-print("Fitting Keras Tokenizer on training data (word-level)...")
-
-word_tokenizer = Tokenizer(oov_token="<OOV>")
-word_tokenizer.fit_on_texts(X_train)
+def dataset_cache_dir(paths, max_len, root=PREPARED_CACHE_ROOT):
+    """Cache directory keyed on the cache versions, the source files' mtimes and sizes, and MAX_LEN."""
+    key = hashlib.sha1(f"{PREPARED_CACHE_VERSION}:{PARSE_CACHE_VERSION}\n".encode())
+    for path in paths:
+        stat = os.stat(path)
+        key.update(f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}\n".encode())
+    key.update(f"max_len={max_len}".encode())
+    return os.path.join(root, key.hexdigest())
+
+cache_dir = dataset_cache_dir([train_path, dev_path, test_path], MAX_LEN)
+use_cache = all(os.path.exists(os.path.join(cache_dir, name))
+                for name in ("word_index.json", "arrays.npz"))
+
+OOV_ID = 1
+OOV_TOKEN = "<OOV>"
+
+def build_word_index(sentences):
+    """
+    Map lowercased words to IDs by descending frequency, like Keras' Tokenizer:
+    0 is reserved for padding and 1 for out-of-vocabulary words.
+    """
+    word_counts = Counter(w.lower() for sent in sentences for w in sent)
+    word_index = {OOV_TOKEN: OOV_ID}
+    word_index.update((w, i) for i, (w, _) in enumerate(word_counts.most_common(), start=OOV_ID + 1))
+    return word_index
+
+if use_cache:
+    print(f"Loading cached word vocabulary from {cache_dir}...")
+    with open(os.path.join(cache_dir, "word_index.json"), encoding="utf-8") as f:
+        word_index = json.load(f)
+else:
+    print("Building word vocabulary from training data (word-level)...")
+    word_index = build_word_index(X_train)
 
-word_index = word_tokenizer.word_index
+index_word = {i: w for w, i in word_index.items()}
 vocab_size = len(word_index) + 1  # +1 for padding index 0
 
+# Array version of index_word so whole ID sequences decode with one indexing op
+idx2word_arr = np.full(vocab_size, "<UNK>", dtype=object)
+idx2word_arr[list(index_word.keys())] = list(index_word.values())
+
 print(f"Vocabulary size: {vocab_size}")
 
 # ------------------------------------------------------------
@@ -63,7 +108,7 @@ print("Creating POS tag mapping...")
 
 unique_tags = sorted(set(tag for sent in y_train for tag in sent))
 tag2id = {tag: i for i, tag in enumerate(unique_tags)}
-id2tag = {i: tag for tag, i in tag2id.items()}
+id2tag_arr = np.array(unique_tags, dtype=object)
 num_tags = len(tag2id)
 
 
@@ -73,29 +118,71 @@ print(f"Tags: {unique_tags}\n")
 # ------------------------------------------------------------
 # 5. Convert sentences and tags to integer sequences
 # ------------------------------------------------------------
-def encode_sentences_and_tags(X, y, word_tokenizer, tag2id):
+def encode_sentences_and_tags(X, y, word_index, tag2id):
     """Convert tokens and tags to integer sequences."""
-    X_encoded = word_tokenizer.texts_to_sequences(X)
-    y_encoded = [[tag2id[tag] for tag in tags] for tags in y]
+    # map() over the bound dict.get keeps the per-word lookup in C
+    lookup = word_index.get
+    X_encoded = [list(map(lookup, map(str.lower, sent), repeat(OOV_ID))) for sent in X]
+    # Encode all tags in a single pass, then split back into sentences
+    lengths = np.fromiter(map(len, y), dtype=np.int64, count=len(y))
+    tag_ids = np.fromiter(map(tag2id.__getitem__, chain.from_iterable(y)),
+                          dtype=np.int8, count=lengths.sum())
+    y_encoded = np.split(tag_ids, np.cumsum(lengths)[:-1])
     return X_encoded, y_encoded
 
-X_train_ids, y_train_ids = encode_sentences_and_tags(X_train, y_train, word_tokenizer, tag2id)
-X_dev_ids, y_dev_ids = encode_sentences_and_tags(X_dev, y_dev, word_tokenizer, tag2id)
-X_test_ids, y_test_ids = encode_sentences_and_tags(X_test, y_test, word_tokenizer, tag2id)
+if not use_cache:
+    X_train_ids, y_train_ids = encode_sentences_and_tags(X_train, y_train, word_index, tag2id)
+    X_dev_ids, y_dev_ids = encode_sentences_and_tags(X_dev, y_dev, word_index, tag2id)
+    X_test_ids, y_test_ids = encode_sentences_and_tags(X_test, y_test, word_index, tag2id)
 
 # ------------------------------------------------------------
 # 6. Pad sequences to uniform length
 # ------------------------------------------------------------
-MAX_LEN = 128
-
-X_train_padded = pad_sequences(X_train_ids, maxlen=MAX_LEN, padding='post', truncating='post')
-y_train_padded = pad_sequences(y_train_ids, maxlen=MAX_LEN, padding='post', truncating='post')
-
-X_dev_padded = pad_sequences(X_dev_ids, maxlen=MAX_LEN, padding='post', truncating='post')
-y_dev_padded = pad_sequences(y_dev_ids, maxlen=MAX_LEN, padding='post', truncating='post')
-
-X_test_padded = pad_sequences(X_test_ids, maxlen=MAX_LEN, padding='post', truncating='post')
-y_test_padded = pad_sequences(y_test_ids, maxlen=MAX_LEN, padding='post', truncating='post')
+def pad_sequences_post(sequences, maxlen, dtype):
+    """Pad or truncate every sequence at the end into one preallocated array."""
+    padded = np.zeros((len(sequences), maxlen), dtype=dtype)
+    for i, seq in enumerate(sequences):
+        seq = seq[:maxlen]
+        padded[i, :len(seq)] = seq
+    return padded
+
+if use_cache:
+    print(f"Loading cached padded sequences from {cache_dir}...")
+    with np.load(os.path.join(cache_dir, "arrays.npz")) as arrays:
+        X_train_padded, y_train_padded = arrays["X_train_padded"], arrays["y_train_padded"]
+        X_dev_padded, y_dev_padded = arrays["X_dev_padded"], arrays["y_dev_padded"]
+        X_test_padded, y_test_padded = arrays["X_test_padded"], arrays["y_test_padded"]
+    # The cached arrays must line up with the sentences parsed in this run
+    for name, padded, sentences in (("train", X_train_padded, X_train),
+                                    ("dev", X_dev_padded, X_dev),
+                                    ("test", X_test_padded, X_test)):
+        assert len(padded) == len(sentences), (
+            f"Cached {name} arrays have {len(padded)} rows for {len(sentences)} sentences; "
+            f"delete {cache_dir} and rerun")
+else:
+    # Use the narrowest integer types that fit: tag IDs fit in int8, word IDs in
+    # int16 unless the vocabulary is larger than 32k words
+    word_dtype = np.int16 if vocab_size <= np.iinfo(np.int16).max else np.int32
+    tag_dtype = np.int8
+
+    X_train_padded = pad_sequences_post(X_train_ids, MAX_LEN, word_dtype)
+    y_train_padded = pad_sequences_post(y_train_ids, MAX_LEN, tag_dtype)
+
+    X_dev_padded = pad_sequences_post(X_dev_ids, MAX_LEN, word_dtype)
+    y_dev_padded = pad_sequences_post(y_dev_ids, MAX_LEN, tag_dtype)
+
+    X_test_padded = pad_sequences_post(X_test_ids, MAX_LEN, word_dtype)
+    y_test_padded = pad_sequences_post(y_test_ids, MAX_LEN, tag_dtype)
+
+    # Save the vocabulary and padded sequences so the next run can skip steps 3-6
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, "word_index.json"), "w", encoding="utf-8") as f:
+        json.dump(word_index, f)
+    np.savez_compressed(os.path.join(cache_dir, "arrays.npz"),
+                        X_train_padded=X_train_padded, y_train_padded=y_train_padded,
+                        X_dev_padded=X_dev_padded, y_dev_padded=y_dev_padded,
+                        X_test_padded=X_test_padded, y_test_padded=y_test_padded)
+    print(f"Cached word vocabulary and padded sequences in {cache_dir}")
 
 print(f"Padded sequences to length {MAX_LEN}")
 print(f"Example encoded + padded sentence:")
@@ -116,10 +203,11 @@ print("Validation passed: All input and tag sequences aligned correctly.\n")
 # =============================================================================
 # DEMO: Verifying the word-to-ID mapping for a single sentence
 #
-# This block demonstrates that our tokenization and padding process is fully
+# This block demonstrates that our tokenization and padding process is
 # reversible. It takes a single sentence from the training set, retrieves its
-# padded integer representation, reverses the process, and verifies that the
-# decoded result perfectly matches the original data.
+# padded integer representation and decodes it back for display. It then
+# verifies the mapping by re-encoding the original words and tags and checking
+# that the resulting IDs match the stored ones.
 # =============================================================================
 print("\n" + "="*60)
 print("DEMO: Mapping a Sentence to IDs and Back")
@@ -141,31 +229,44 @@ word_ids_no_padding = padded_word_ids[:original_length]
 tag_ids_no_padding = padded_tag_ids[:original_length]
 
 # 4. Decode the integer IDs back into their original string representations.
-#    The Keras Tokenizer provides an `index_word` attribute for reverse mapping of word IDs.
-decoded_words = [word_tokenizer.index_word.get(i, "<UNK>") for i in word_ids_no_padding]
-#    We use our previously created 'id2tag' dictionary for the PoS tag IDs.
-decoded_tags = [id2tag.get(i, "<UNK>") for i in tag_ids_no_padding]
+#    The ID arrays index straight into the `idx2word_arr` and `id2tag_arr`
+#    lookup arrays built alongside the vocabulary and tag mapping.
+decoded_words = idx2word_arr[word_ids_no_padding].tolist()
+decoded_tags = id2tag_arr[tag_ids_no_padding].tolist()
 
 # 5. Display a side-by-side comparison to visually verify the mappings.
 print(f"--- Analyzing Sentence #{sample_idx} ---")
-print(f"Original Sentence: {' '.join(original_words)}\n")
+print(f"Original Sentence: {' '.join(original_words)}")
+print(f"Decoded Sentence:  {' '.join(decoded_words)}")
+print(f"Decoded Tags:      {' '.join(decoded_tags)}\n")
+
+# Row template shared by the header and every token row (word, word ID, tag, tag ID)
+_ROW_FMT = "{:<18} | {:<10} | {:<15} | {:<10}".format
 
-print(f"{'WORD':<18} | {'WORD_ID':<10} | {'PoS TAG':<15} | {'POS_ID':<10}")
+print(_ROW_FMT('WORD', 'WORD_ID', 'PoS TAG', 'POS_ID'))
 print("-" * 65)
 
-for i in range(original_length):
-    word = original_words[i]
-    w_id = word_ids_no_padding[i]
-    tag = original_tags[i]
-    t_id = tag_ids_no_padding[i]
-    print(f"{word:<18} | {w_id:<10} | {tag:<15} | {t_id:<10}")
+# Format every row first and write the table out in one go. The IDs are
+# converted to Python ints up front, which format faster than NumPy scalars.
+rows = map(_ROW_FMT, original_words, word_ids_no_padding.tolist(),
+           original_tags, tag_ids_no_padding.tolist())
+sys.stdout.write("\n".join(rows) + "\n")
 
 # 6. Perform a final programmatic check to confirm the bidirectionality of the mapping.
+#    The mapping is deterministic, so re-encoding the original sentence must give
+#    back exactly the stored IDs; comparing int arrays avoids comparing strings
+#    (and the lowercasing applied to words).
 print("\n--- Verification ---")
-print(f"Original sentence matches decoded sentence: {original_words == decoded_words}")
-print(f"Original tags match decoded tags: {original_tags == decoded_tags}")
-
-if original_words == decoded_words and original_tags == decoded_tags:
+expected_word_ids = np.fromiter(map(word_index.get, map(str.lower, original_words), repeat(OOV_ID)),
+                                dtype=word_ids_no_padding.dtype, count=original_length)
+expected_tag_ids = np.fromiter(map(tag2id.__getitem__, original_tags),
+                               dtype=tag_ids_no_padding.dtype, count=original_length)
+words_match = np.array_equal(expected_word_ids, word_ids_no_padding)
+tags_match = np.array_equal(expected_tag_ids, tag_ids_no_padding)
+print(f"Original sentence matches stored word IDs: {words_match}")
+print(f"Original tags match stored tag IDs: {tags_match}")
+
+if words_match and tags_match:
     print("\nSuccess! The round-trip mapping is working correctly. ✅")
 else:
     print("\nWarning! A discrepancy was found in the mapping process. ⚠️")
@@ -6,10 +6,15 @@ Usage Example: CoNLL-U Processor for PoS Tagging
 This example demonstrates how to use the CoNLL-U processor for your PoS tagging assignment.
 """
 
-from conllu_processor import CoNLLUProcessor, load_ud_english_data
+import heapq
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
 
 def example_basic_usage():
     """Example of basic usage - loading a single file."""
+    from conllu_processor import CoNLLUProcessor
+    
     print("=== BASIC USAGE EXAMPLE ===")
     
     # Create processor instance
@@ -33,6 +38,8 @@ def example_basic_usage():
 
 def example_full_dataset():
     """Example of loading all three dataset files."""
+    from conllu_processor import load_ud_english_data
+    
     print("\n=== FULL DATASET LOADING ===")
     
     # Define file paths
@@ -57,6 +64,8 @@ def example_full_dataset():
 
 def example_data_analysis():
     """Example of analyzing the processed data."""
+    from conllu_processor import CoNLLUProcessor
+    
     print("\n=== DATA ANALYSIS EXAMPLE ===")
     
     # Load just development data for analysis
@@ -72,15 +81,17 @@ def example_data_analysis():
     print(f"Number of POS tags: {len(pos_tags)}")
     
     print(f"\nPOS tag distribution:")
-    for tag, count in sorted(pos_tags.items(), key=lambda x: x[1], reverse=True):
+    for tag, count in sorted(pos_tags.items(), key=itemgetter(1), reverse=True):
         print(f"  {tag:8s}: {count:5d}")
     
     print(f"\nSentence length distribution (first 10):")
-    for length, count in sorted(sentence_lengths.items())[:10]:
+    for length, count in heapq.nsmallest(10, sentence_lengths.items(), key=itemgetter(0)):
         print(f"  Length {length:2d}: {count:3d} sentences")
 
 def prepare_data_for_neural_model():
     """Example of preparing data for neural PoS tagging model."""
+    from conllu_processor import load_ud_english_data
+    
     print("\n=== PREPARING DATA FOR NEURAL MODEL ===")
     
     # Load all datasets
@@ -97,18 +108,15 @@ def prepare_data_for_neural_model():
     test_data = processors['test'].get_word_pos_pairs()
     
     # Example: Create word and POS vocabularies for model
-    all_words = set()
-    all_pos_tags = set()
-    
-    for dataset in [train_data, dev_data, test_data]:
-        for sentence in dataset:
-            for word, pos_tag in sentence:
-                all_words.add(word)
-                all_pos_tags.add(pos_tag)
+    # (counted from the processors' flat forms/upos columns in a single pass each,
+    # so the vocabularies come with their frequencies)
+    columns = [processor.get_columns() for processor in processors.values()]
+    word_counts = Counter(chain.from_iterable(forms for forms, _, _ in columns))
+    pos_counts = Counter(chain.from_iterable(upos for _, upos, _ in columns))
     
-    print(f"Total unique words across all datasets: {len(all_words)}")
-    print(f"Total unique POS tags: {len(all_pos_tags)}")
-    print(f"POS tags: {sorted(list(all_pos_tags))}")
+    print(f"Total unique words across all datasets: {len(word_counts)}")
+    print(f"Total unique POS tags: {len(pos_counts)}")
+    print(f"POS tags: {sorted(pos_counts)}")
     
     # Example: Show data format ready for neural model
     print(f"\nExample data format for neural model:")
@@ -119,8 +127,10 @@ def prepare_data_for_neural_model():
         'train': train_data,
         'dev': dev_data, 
         'test': test_data,
-        'word_vocab': sorted(list(all_words)),
-        'pos_vocab': sorted(list(all_pos_tags))
+        'word_vocab': sorted(word_counts),
+        'pos_vocab': sorted(pos_counts),
+        'word_counts': word_counts,
+        'pos_counts': pos_counts
     }
 
 if __name__ == "__main__":